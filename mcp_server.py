@@ -1,3 +1,7 @@
+import re
+import time
+import zlib
+
 from mcp.server.fastmcp import FastMCP
 
 from agents.cogsolframeworkagent import CogsolFrameworkAgent
@@ -7,6 +11,19 @@ mcp = FastMCP("CogSol Framework Assistant", port=8008)
 _agent = CogsolFrameworkAgent()
 _retrieval = CogsolFrameworkDocsRetrieval()
 
+SNIPPET_CHARS = 320
+MIN_BYTES = 300
+CACHE_TTL_SECONDS = 300
+CACHE_SIZE = 32
+_TERM_RE = re.compile(r"\w{3,}")
+_STOPWORDS = frozenset({
+    "about", "and", "any", "are", "can", "does", "for", "from", "have", "how", "into",
+    "not", "should", "that", "the", "their", "them", "then", "there", "these", "this",
+    "use", "using", "want", "was", "what", "when", "where", "which", "who", "why",
+    "will", "with", "would", "you", "your",
+})
+_results_cache: dict[str, tuple[float, tuple]] = {}
+
 
 @mcp.tool()
 def ask_cogsol_framework(question: str, reset: bool = False) -> str:
@@ -17,14 +34,148 @@ def ask_cogsol_framework(question: str, reset: bool = False) -> str:
         return ""
     return messages[-1].get("content", "")
 
-@mcp.tool()
-def search_framework_docs(question: str) -> str:
-    """Search the CogSol Framework documentation."""
+
+def _similar_blocks(question: str) -> tuple:
+    """Return retrieval results for a question, reusing non-empty ones for a short TTL."""
+    now = time.monotonic()
+    cached = _results_cache.get(question)
+    if cached and now - cached[0] < CACHE_TTL_SECONDS:
+        return cached[1]
     results = _retrieval.run(question)
-    similar_blocks = results.get("similar_blocks", [])
+    similar_blocks = tuple(results.get("similar_blocks", []))
+    if similar_blocks:
+        for key in [key for key, (stored, _) in _results_cache.items() if now - stored >= CACHE_TTL_SECONDS]:
+            del _results_cache[key]
+        _results_cache.pop(question, None)
+        _results_cache[question] = (now, similar_blocks)
+        while len(_results_cache) > CACHE_SIZE:
+            del _results_cache[next(iter(_results_cache))]
+    return similar_blocks
+
+
+def _fingerprint(similar_blocks: tuple) -> str:
+    """Identify a result set so refs issued for it fail if the results change."""
+    digest = zlib.crc32("\0".join(f"{b['source']}\0{b['text']}" for b in similar_blocks).encode("utf-8"))
+    return f"{digest:08x}"
+
+
+def _resolve_ref(question: str, ref: str) -> tuple[tuple, int] | str:
+    """Parse an ``<index>-<fingerprint>`` ref, returning an error message if it is stale."""
+    index, _, fingerprint = ref.partition("-")
+    if not index.isdigit() or not fingerprint:
+        return f"Invalid reference '{ref}'."
+    similar_blocks = _similar_blocks(question)
+    if _fingerprint(similar_blocks) != fingerprint:
+        return "The search results have changed since this reference was issued; search again."
+    if int(index) >= len(similar_blocks):
+        return f"Reference '{ref}' is out of range."
+    return similar_blocks, int(index)
+
+
+def _query_terms(question: str) -> set[str]:
+    return {term for term in (t.lower() for t in _TERM_RE.findall(question)) if term not in _STOPWORDS}
+
+
+def _snippet_bounds(text: str, terms: set[str], size: int) -> tuple[int, int]:
+    """Return the (start, end) window of ``size`` chars covering the most query terms."""
+    if len(text) <= size:
+        return 0, len(text)
+    hits = sorted(
+        (m.start(), term)
+        for term in terms
+        for m in re.finditer(rf"\b{re.escape(term)}\b", text, re.IGNORECASE)
+    )
+    best_start, best_score = 0, (0, 0)
+    for position, _ in hits:
+        start = max(0, min(position - size // 4, len(text) - size))
+        window = [term for p, term in hits if start <= p < start + size]
+        score = (len(set(window)), len(window))
+        if score > best_score:
+            best_start, best_score = start, score
+    return best_start, best_start + size
+
+
+def _format_snippet(ref: str, block: dict, start: int, end: int) -> str:
+    text = block["text"]
+    snippet = " ".join(text[start:end].split())
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if end < len(text) else ""
+    return f"[{ref}] {block['source']} (chars {start}-{end} of {len(text)}):\n\"{prefix}{snippet}{suffix}\""
+
+
+def _fit_snippet(ref: str, block: dict, start: int, end: int, budget: int) -> str | None:
+    """Format a snippet, shrinking its end until the entry fits in ``budget`` encoded bytes."""
+    entry = _format_snippet(ref, block, start, end)
+    overshoot = len(entry.encode("utf-8")) - budget
+    while overshoot > 0:
+        # A character is at most 4 bytes in UTF-8, so this never trims past the fit point.
+        end -= max(1, overshoot // 4)
+        if end <= start:
+            return None
+        entry = _format_snippet(ref, block, start, end)
+        overshoot = len(entry.encode("utf-8")) - budget
+    return entry
+
+
+@mcp.tool()
+def search_framework_docs(question: str, max_bytes: int = 4000, cursor: str = "") -> str:
+    """Search the CogSol Framework documentation.
+
+    Returns ranked snippets around the matching terms, each tagged with a
+    block reference, source and character offsets, within ``max_bytes``
+    (at least 300). When more results remain, call again with the returned
+    ``cursor``; pass a block reference to ``get_framework_doc_block`` to read
+    the full block.
+    """
+    if max_bytes <= 0:
+        return "max_bytes must be a positive number of bytes."
+    max_bytes = max(max_bytes, MIN_BYTES)
+    if cursor:
+        resolved = _resolve_ref(question, cursor)
+        if isinstance(resolved, str):
+            return resolved
+        similar_blocks, index = resolved
+    else:
+        similar_blocks, index = _similar_blocks(question), 0
     if not similar_blocks:
         return "No relevant documentation found."
-    return "\n\n".join(f"- {block['source']}:\n\"{block['text']}\"" for block in similar_blocks)
+    fingerprint = _fingerprint(similar_blocks)
+    more = "More results available: call again with cursor={ref}."
+    reserve = len(more.format(ref=f"{len(similar_blocks)}-{fingerprint}").encode("utf-8")) + 2
+    terms = _query_terms(question)
+    size = min(SNIPPET_CHARS, (max_bytes - reserve) // 2)
+    entries = []
+    used = 0
+    while index < len(similar_blocks):
+        block = similar_blocks[index]
+        start, end = _snippet_bounds(block["text"], terms, size)
+        budget = max_bytes if index == len(similar_blocks) - 1 else max_bytes - reserve
+        if entries:
+            entry = _format_snippet(f"{index}-{fingerprint}", block, start, end)
+        else:
+            entry = _fit_snippet(f"{index}-{fingerprint}", block, start, end, budget - 2)
+            if entry is None:
+                return "max_bytes is too small to return a result."
+        entry_bytes = len(entry.encode("utf-8")) + 2
+        if used + entry_bytes > budget:
+            break
+        entries.append(entry)
+        used += entry_bytes
+        index += 1
+    if index < len(similar_blocks):
+        entries.append(more.format(ref=f"{index}-{fingerprint}"))
+    return "\n\n".join(entries)
+
+
+@mcp.tool()
+def get_framework_doc_block(question: str, block: str) -> str:
+    """Return the full text of a block, given its reference from ``search_framework_docs`` for the same question."""
+    resolved = _resolve_ref(question, block)
+    if isinstance(resolved, str):
+        return resolved
+    similar_blocks, index = resolved
+    result = similar_blocks[index]
+    return f"- {result['source']}:\n\"{result['text']}\""
 
 
 if __name__ == "__main__":
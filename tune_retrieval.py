@@ -0,0 +1,275 @@
+"""Offline tuning harness for retrieval and ingestion parameters.
+
+Sweeps ``num_refs``, block size, chunk overlap and reordering strategy over a
+local BM25 index built from the ``data/`` corpus, scores each configuration
+against a labelled question set and reports recall@k, MRR, average returned
+bytes and query latency. Configurations on the Pareto front (no other setting
+is at least as good on recall, MRR and returned bytes) are marked with ``*``.
+
+The local index returns the same ``similar_blocks`` payload as
+``BaseRetrieval.run``, so no Content API access is needed. Reordering follows
+the retrieval settings: the top ``retrieval_window`` candidates are reordered,
+keeping the first ``fixed_blocks_reordering`` in place, before cutting to
+``num_refs``.
+
+Usage:
+    python tune_retrieval.py
+    python tune_retrieval.py --num-refs 3,5,8 --block-sizes 1000,1500 --json
+"""
+import argparse
+import json
+import math
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+REORDERING_STRATEGIES = ("none", "position")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def split_blocks(text: str, max_size: int, overlap: int) -> list[tuple[int, int]]:
+    """Split text into (start, end) offsets, preferring paragraph and line breaks."""
+    blocks = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_size, len(text))
+        if end < len(text):
+            floor = start + max_size // 2
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, floor, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        if text[start:end].strip():
+            blocks.append((start, end))
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return blocks
+
+
+class LocalIndex:
+    """In-memory BM25 index over a chunked document corpus."""
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self, corpus: Path, pattern: str, max_size_block: int, chunk_overlap: int):
+        self.blocks = []
+        for path in sorted(corpus.rglob(pattern)):
+            text = path.read_text(encoding="utf-8")
+            source = path.relative_to(corpus).as_posix()
+            for position, (start, end) in enumerate(split_blocks(text, max_size_block, chunk_overlap)):
+                self.blocks.append({
+                    "source": source,
+                    "position": position,
+                    "start": start,
+                    "end": end,
+                    "text": text[start:end],
+                })
+        self._term_freqs = [Counter(_tokenize(block["text"])) for block in self.blocks]
+        self._lengths = [sum(freqs.values()) for freqs in self._term_freqs]
+        self._avg_length = sum(self._lengths) / max(len(self._lengths), 1)
+        doc_freqs = Counter(term for freqs in self._term_freqs for term in freqs)
+        total = len(self.blocks)
+        self._idf = {
+            term: math.log(1 + (total - freq + 0.5) / (freq + 0.5))
+            for term, freq in doc_freqs.items()
+        }
+
+    def _score(self, index: int, terms: list[str]) -> float:
+        freqs = self._term_freqs[index]
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / self._avg_length)
+        score = 0.0
+        for term in terms:
+            freq = freqs.get(term)
+            if freq:
+                score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+        return score
+
+    def run(self, question: str, num_refs: int, reordering: str = "none",
+            retrieval_window: int = 20, fixed_blocks: int = 3) -> dict:
+        """Return the top blocks in the shape of a ``BaseRetrieval.run`` response."""
+        terms = _tokenize(question)
+        scored = [(self._score(i, terms), i) for i in range(len(self.blocks))]
+        ranked = [i for score, i in sorted(scored, key=lambda item: -item[0]) if score > 0]
+        if reordering == "position":
+            window = ranked[:max(retrieval_window, num_refs)]
+            head, tail = window[:fixed_blocks], window[fixed_blocks:]
+            tail.sort(key=lambda i: (self.blocks[i]["source"], self.blocks[i]["position"]))
+            ranked = head + tail
+        return {"similar_blocks": [self.blocks[i] for i in ranked[:num_refs]]}
+
+
+def load_questions(path: Path) -> list[dict]:
+    """Load a JSONL question set with ``question``, ``source`` and ``answer`` keys."""
+    questions = []
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                questions.append(json.loads(line))
+    return questions
+
+
+def source_matches(source: str, label_source: str) -> bool:
+    """Match a label's source against an indexed path, allowing a shorter suffix path."""
+    return source == label_source or source.endswith("/" + label_source)
+
+
+def is_relevant(block: dict, label: dict) -> bool:
+    if not source_matches(block["source"], label["source"]):
+        return False
+    answer = label.get("answer")
+    return not answer or _normalize(answer) in _normalize(block["text"])
+
+
+def evaluate(index: LocalIndex, questions: list[dict], num_refs: int, reordering: str,
+             retrieval_window: int = 20, fixed_blocks: int = 3) -> dict:
+    hits = 0
+    reciprocal_ranks = 0.0
+    returned_bytes = 0
+    elapsed = 0.0
+    for label in questions:
+        started = time.perf_counter()
+        results = index.run(label["question"], num_refs, reordering, retrieval_window, fixed_blocks)
+        elapsed += time.perf_counter() - started
+        similar_blocks = results["similar_blocks"]
+        returned_bytes += sum(len(block["text"].encode("utf-8")) for block in similar_blocks)
+        for rank, block in enumerate(similar_blocks, start=1):
+            if is_relevant(block, label):
+                hits += 1
+                reciprocal_ranks += 1 / rank
+                break
+    total = max(len(questions), 1)
+    return {
+        "recall": hits / total,
+        "mrr": reciprocal_ranks / total,
+        "avg_bytes": returned_bytes / total,
+        "latency_ms": elapsed * 1000 / total,
+    }
+
+
+def _dominates(a: dict, b: dict) -> bool:
+    at_least = a["recall"] >= b["recall"] and a["mrr"] >= b["mrr"] and a["avg_bytes"] <= b["avg_bytes"]
+    better = a["recall"] > b["recall"] or a["mrr"] > b["mrr"] or a["avg_bytes"] < b["avg_bytes"]
+    return at_least and better
+
+
+def mark_pareto(results: list[dict]) -> None:
+    for result in results:
+        result["pareto"] = not any(_dominates(other, result) for other in results)
+
+
+def sweep(corpus: Path, pattern: str, questions: list[dict], num_refs: list[int],
+          block_sizes: list[int], overlaps: list[int], strategies: list[str],
+          retrieval_window: int = 20, fixed_blocks: int = 3) -> list[dict]:
+    results = []
+    for max_size_block in block_sizes:
+        for chunk_overlap in overlaps:
+            index = LocalIndex(corpus, pattern, max_size_block, chunk_overlap)
+            for refs in num_refs:
+                for strategy in strategies:
+                    metrics = evaluate(index, questions, refs, strategy, retrieval_window, fixed_blocks)
+                    results.append({
+                        "num_refs": refs,
+                        "max_size_block": max_size_block,
+                        "chunk_overlap": chunk_overlap,
+                        "reordering": strategy,
+                        "blocks": len(index.blocks),
+                        **metrics,
+                    })
+    mark_pareto(results)
+    return results
+
+
+def format_table(results: list[dict]) -> str:
+    header = f"{'':1} {'num_refs':>8} {'block':>6} {'overlap':>7} {'reorder':>8} {'recall@k':>8} {'MRR':>6} {'avg_bytes':>9} {'ms':>7}"
+    lines = [header, "-" * len(header)]
+    for r in sorted(results, key=lambda r: (-r["recall"], -r["mrr"], r["avg_bytes"])):
+        lines.append(
+            f"{'*' if r['pareto'] else '':1} {r['num_refs']:>8} {r['max_size_block']:>6} {r['chunk_overlap']:>7} "
+            f"{r['reordering']:>8} {r['recall']:>8.3f} {r['mrr']:>6.3f} {r['avg_bytes']:>9.0f} {r['latency_ms']:>7.2f}"
+        )
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _strategy_list(value: str) -> list[str]:
+    strategies = [item.strip() for item in value.split(",") if item.strip()]
+    for strategy in strategies:
+        if strategy not in REORDERING_STRATEGIES:
+            raise argparse.ArgumentTypeError(
+                f"unknown reordering strategy '{strategy}' (choose from {', '.join(REORDERING_STRATEGIES)})"
+            )
+    return strategies
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep retrieval parameters against a labelled question set.")
+    parser.add_argument("--questions", type=Path, default=BASE_DIR / "retrieval_questions.jsonl")
+    parser.add_argument("--corpus", type=Path, default=BASE_DIR / "data" / "CogsolFrameworkDocs")
+    parser.add_argument("--pattern", default="*.txt")
+    parser.add_argument("--num-refs", type=_int_list, default=[3, 5, 8, 10])
+    parser.add_argument("--block-sizes", type=_int_list, default=[800, 1500, 2500])
+    parser.add_argument("--overlaps", type=_int_list, default=[0, 150])
+    parser.add_argument("--reordering", type=_strategy_list, default=list(REORDERING_STRATEGIES))
+    parser.add_argument("--retrieval-window", type=int, default=20,
+                        help="Candidates considered when reordering (retrieval_window).")
+    parser.add_argument("--fixed-blocks", type=int, default=3,
+                        help="Top candidates kept in place when reordering (fixed_blocks_reordering).")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table.")
+    args = parser.parse_args(argv)
+    if any(refs < 1 for refs in args.num_refs):
+        parser.error("num_refs values must be at least 1")
+    if any(size < 1 for size in args.block_sizes):
+        parser.error("block sizes must be at least 1")
+    invalid = sorted({
+        overlap for size in args.block_sizes for overlap in args.overlaps if not 0 <= overlap < size
+    })
+    if invalid:
+        parser.error(
+            f"chunk overlap must be at least 0 and smaller than every block size ({', '.join(map(str, invalid))})"
+        )
+    if args.retrieval_window < 1:
+        parser.error("--retrieval-window must be at least 1")
+    if args.fixed_blocks < 0:
+        parser.error("--fixed-blocks must not be negative")
+
+    questions = load_questions(args.questions)
+    if not questions:
+        print(f"No questions found in {args.questions}.")
+        return 1
+    sources = [path.relative_to(args.corpus).as_posix() for path in args.corpus.rglob(args.pattern)]
+    unmatched = sorted({
+        label["source"] for label in questions
+        if not any(source_matches(source, label["source"]) for source in sources)
+    })
+    if unmatched:
+        print(f"Label sources not found under {args.corpus}: {', '.join(unmatched)}")
+        return 1
+    results = sweep(args.corpus, args.pattern, questions, args.num_refs,
+                    args.block_sizes, args.overlaps, args.reordering,
+                    args.retrieval_window, args.fixed_blocks)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{len(questions)} questions, {len(results)} configurations (* = Pareto-optimal)\n")
+        print(format_table(results))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())